@@ -1,13 +1,19 @@
 import streamlit as st
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from urllib.parse import urlparse, urljoin
 import xml.etree.ElementTree as ET
-from bs4 import BeautifulSoup
+from lxml import etree
 import pandas as pd
-from fake_useragent import UserAgent
 import re
 from datetime import datetime
 import time
+import atexit
+import threading
+import concurrent.futures
+from collections import defaultdict, Counter
+from itertools import chain
 
 # Set page configuration
 st.set_page_config(
@@ -19,44 +25,170 @@ st.set_page_config(
 
 # Initialize session state
 if 'results_data' not in st.session_state:
-    st.session_state.results_data = []
+    st.session_state.results_data = {}
 if 'analysis_complete' not in st.session_state:
     st.session_state.analysis_complete = False
+if 'df' not in st.session_state:
+    st.session_state.df = None
+if 'result_cache' not in st.session_state:
+    st.session_state.result_cache = {}
 
-# Initialize fake user agent
-ua = UserAgent()
+# Request headers sent with every fetch
+_HEADERS = {
+    'User-Agent': (
+        'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 '
+        '(KHTML, like Gecko) Chrome/124.0 Safari/537.36 HreflangAnalyzer/1.0'
+    )
+}
 
-def extract_urls_from_sitemap(sitemap_url):
-    """Extract URLs from XML sitemap"""
-    try:
-        headers = {'User-Agent': ua.random}
-        response = requests.get(sitemap_url, headers=headers, timeout=10)
+@st.cache_resource
+def get_session():
+    """Create the HTTP session shared across reruns so pooled connections stay alive"""
+    session = requests.Session()
+    session.headers.update(_HEADERS)
+    # pool_connections is the number of per-host pools kept alive, so sitemaps
+    # spread across many subdomains don't keep evicting (and re-handshaking) hosts
+    adapter = HTTPAdapter(
+        pool_connections=100,
+        pool_maxsize=20,
+        max_retries=Retry(total=2, backoff_factor=0.3)
+    )
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    atexit.register(session.close)
+    return session
+
+SESSION = get_session()
+
+# Minimum delay in seconds between two requests to the same host
+HOST_DELAY = 0.5
+_host_last_request = {}
+_host_lock = threading.Lock()
+
+def wait_for_host(url):
+    """Be polite to servers: space out requests that hit the same host"""
+    host = urlparse(url).netloc
+    with _host_lock:
+        now = time.monotonic()
+        slot = max(now, _host_last_request.get(host, 0) + HOST_DELAY)
+        _host_last_request[host] = slot
+    if slot > now:
+        time.sleep(slot - now)
+
+# Largest number of same-host URLs handed to one worker at a time
+HOST_BATCH_SIZE = 10
+
+def group_urls_by_host(urls, max_threads):
+    """Split URLs into batches that each contain URLs of a single host"""
+    buckets = defaultdict(list)
+    for url in urls:
+        buckets[urlparse(url).netloc].append(url)
+    
+    batches = []
+    for host_urls in buckets.values():
+        # A large host is still spread over all workers; wait_for_host keeps it polite
+        size = min(HOST_BATCH_SIZE, -(-len(host_urls) // max_threads))
+        batches.extend(host_urls[i:i + size] for i in range(0, len(host_urls), size))
+    return batches
+
+# Language and region code lookups
+LANGUAGES = {
+    'en': 'English', 'ar': 'Arabic', 'es': 'Spanish', 'fr': 'French',
+    'de': 'German', 'ja': 'Japanese', 'ko': 'Korean', 'zh': 'Chinese',
+    'ru': 'Russian', 'pt': 'Portuguese', 'it': 'Italian', 'nl': 'Dutch',
+    'tr': 'Turkish', 'sv': 'Swedish', 'pl': 'Polish', 'vi': 'Vietnamese',
+    'th': 'Thai', 'id': 'Indonesian', 'ms': 'Malaysian', 'hi': 'Hindi'
+}
+
+REGIONS = {
+    'us': 'United States', 'gb': 'United Kingdom', 'ae': 'United Arab Emirates',
+    'sa': 'Saudi Arabia', 'kw': 'Kuwait', 'qa': 'Qatar', 'om': 'Oman',
+    'bh': 'Bahrain', 'eg': 'Egypt', 'iq': 'Iraq', 'jo': 'Jordan',
+    'lb': 'Lebanon', 'ly': 'Libya', 'ps': 'Palestinian Territory',
+    'sd': 'Sudan', 'so': 'Somalia', 'sy': 'Syria', 'ye': 'Yemen',
+    'au': 'Australia', 'ca': 'Canada', 'in': 'India', 'pk': 'Pakistan',
+    'bd': 'Bangladesh', 'cn': 'China', 'jp': 'Japan', 'kr': 'South Korea',
+    'de': 'Germany', 'fr': 'France', 'it': 'Italy', 'es': 'Spain',
+    'ru': 'Russia', 'br': 'Brazil', 'mx': 'Mexico', 'ar': 'Argentina'
+}
+
+# Columns of the analysis results, stored as one list per column
+RESULT_COLUMNS = (
+    'url', 'hreflang_count', 'self_ref', 'hreflang_tag', 'language',
+    'region', 'alt_url', 'warnings', 'errors'
+)
+# Low-cardinality columns kept as pandas categoricals
+CATEGORY_COLUMNS = ('self_ref', 'hreflang_tag', 'language', 'region')
+
+# Valid hreflang value: language code with optional region
+_LANG_RE = re.compile(r'^[a-z]{2}(?:-[a-z]{2})?$')
+_HTTP_SCHEMES = ('http://', 'https://')
+
+def fetch_sitemap(sitemap_url, session=SESSION):
+    """Fetch a single sitemap and return its (kind, loc) entries, kind being 'url' or 'sitemap'"""
+    with session.get(sitemap_url, timeout=10, stream=True) as response:
         response.raise_for_status()
+        response.raw.decode_content = True
         
-        urls = []
-        root = ET.fromstring(response.content)
-        
-        # Sitemap index
-        if root.tag.endswith('sitemapindex'):
-            for sitemap in root.findall('.//{*}sitemap/{*}loc'):
-                urls.extend(extract_urls_from_sitemap(sitemap.text))
-        # URL sitemap
-        else:
-            for url in root.findall('.//{*}url/{*}loc'):
-                urls.append(url.text)
+        # Stream the XML and drop each entry once read so the tree never builds up
+        entries = []
+        root = None
+        for event, elem in ET.iterparse(response.raw, events=('start', 'end')):
+            if root is None:
+                root = elem
+                continue
+            if event != 'end':
+                continue
+            tag = elem.tag.rsplit('}', 1)[-1]
+            if tag in ('url', 'sitemap'):
+                # Only the entry's own <loc>, not nested ones such as <image:loc>
+                loc = elem.find('{*}loc')
+                if loc is not None and loc.text:
+                    entries.append((tag, loc.text))
+                root.clear()
         
-        return urls
-    except Exception as e:
-        st.error(f"Error processing sitemap {sitemap_url}: {str(e)}")
-        return []
+        return entries
 
-def analyze_hreflang_tag(lang, href, source_url, all_tags):
+def extract_urls_from_sitemap(sitemap_url, session=SESSION, max_threads=3, max_depth=5):
+    """Yield URLs from XML sitemap, fetching nested sitemaps concurrently
+    
+    Each sitemap is fetched at most once, and sitemap indexes are followed
+    at most max_depth levels deep.
+    """
+    pending = [sitemap_url]
+    seen = {sitemap_url}
+    depth = 0
+    
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_threads) as executor:
+        # Fetch the sitemap tree one level at a time
+        while pending:
+            futures = [(url, executor.submit(fetch_sitemap, url, session)) for url in pending]
+            pending = []
+            for url, future in futures:
+                try:
+                    entries = future.result()
+                except Exception as e:
+                    st.error(f"Error processing sitemap {url}: {str(e)}")
+                    continue
+                for kind, loc in entries:
+                    if kind != 'sitemap':
+                        yield loc
+                    elif loc not in seen:
+                        seen.add(loc)
+                        pending.append(loc)
+            
+            depth += 1
+            if pending and depth > max_depth:
+                st.warning(f"Skipped {len(pending)} sitemaps nested more than {max_depth} levels deep")
+                break
+
+def analyze_hreflang_tag(lang, href, source_url, tag_set):
     """Analyze individual hreflang tag for issues"""
     warnings = []
     errors = []
     
     # Check language format
-    if not re.match(r'^[a-z]{2}(-[a-z]{2})?$', lang) and lang != 'x-default':
+    if not _LANG_RE.match(lang) and lang != 'x-default':
         errors.append("Invalid hreflang format")
     
     # Check self-reference
@@ -66,12 +198,11 @@ def analyze_hreflang_tag(lang, href, source_url, all_tags):
     # Check for region-independent fallback
     if '-' in lang:
         base_lang = lang.split('-')[0]
-        has_fallback = any(tag == base_lang for tag, h in all_tags)
-        if not has_fallback:
+        if base_lang not in tag_set:
             warnings.append(f"Missing region-independent link for {base_lang}")
     
     # Check URL validity
-    if not href.startswith(('http://', 'https://')):
+    if not href.startswith(_HTTP_SCHEMES):
         errors.append("Invalid URL format")
     
     # Check if alternate URL is in same domain
@@ -80,106 +211,199 @@ def analyze_hreflang_tag(lang, href, source_url, all_tags):
     
     return warnings, errors
 
-def get_language_name(code):
-    """Convert language code to full name"""
-    languages = {
-        'en': 'English', 'ar': 'Arabic', 'es': 'Spanish', 'fr': 'French',
-        'de': 'German', 'ja': 'Japanese', 'ko': 'Korean', 'zh': 'Chinese',
-        'ru': 'Russian', 'pt': 'Portuguese', 'it': 'Italian', 'nl': 'Dutch',
-        'tr': 'Turkish', 'sv': 'Swedish', 'pl': 'Polish', 'vi': 'Vietnamese',
-        'th': 'Thai', 'id': 'Indonesian', 'ms': 'Malaysian', 'hi': 'Hindi'
-    }
-    return languages.get(code, code)
+def extract_hreflang_links(chunks):
+    """Read hreflang link tags from streamed HTML chunks, stopping at </head>"""
+    parser = etree.HTMLPullParser(events=('end',))
+    links = []
+    
+    def collect(events):
+        for _, elem in events:
+            if elem.tag == 'head':
+                return True
+            if elem.tag == 'link' and elem.get('hreflang') is not None:
+                if 'alternate' in elem.get('rel', '').lower().split():
+                    links.append((elem.get('hreflang'), elem.get('href')))
+        return False
+    
+    for chunk in chunks:
+        parser.feed(chunk)
+        if collect(parser.read_events()):
+            return links
+    
+    # An empty body has no document to close; it simply has no links
+    try:
+        parser.close()
+    except etree.XMLSyntaxError:
+        return links
+    collect(parser.read_events())
+    return links
+
+# Bodies up to this many bytes are read to the end so their connection can be reused
+DRAIN_LIMIT = 64 * 1024
+
+def release_connection(response, chunks):
+    """Hand a partly read response's connection back to the pool when the rest is small
+    
+    Closing a response mid-body drops its connection, so the next request to
+    that host pays a new handshake. Large or unsized bodies are still dropped.
+    chunks is the response's iter_content iterator that has been read so far.
+    """
+    length = response.headers.get('Content-Length', '')
+    if length.isdigit() and int(length) <= DRAIN_LIMIT:
+        for _ in chunks:
+            pass
 
-def get_region_name(code):
-    """Convert region code to full name"""
-    regions = {
-        'us': 'United States', 'gb': 'United Kingdom', 'ae': 'United Arab Emirates',
-        'sa': 'Saudi Arabia', 'kw': 'Kuwait', 'qa': 'Qatar', 'om': 'Oman',
-        'bh': 'Bahrain', 'eg': 'Egypt', 'iq': 'Iraq', 'jo': 'Jordan',
-        'lb': 'Lebanon', 'ly': 'Libya', 'ps': 'Palestinian Territory',
-        'sd': 'Sudan', 'so': 'Somalia', 'sy': 'Syria', 'ye': 'Yemen',
-        'au': 'Australia', 'ca': 'Canada', 'in': 'India', 'pk': 'Pakistan',
-        'bd': 'Bangladesh', 'cn': 'China', 'jp': 'Japan', 'kr': 'South Korea',
-        'de': 'Germany', 'fr': 'France', 'it': 'Italy', 'es': 'Spain',
-        'ru': 'Russia', 'br': 'Brazil', 'mx': 'Mexico', 'ar': 'Argentina'
+def analyze_hreflang_links(url, links):
+    """Analyze the (hreflang, href) links found on a page and return result columns"""
+    # Extract hreflang tags, collecting the page's hreflang values and
+    # alternate URLs in the same pass for constant-time lookups
+    hreflang_tags = [None] * len(links)
+    tag_set = set()
+    href_set = set()
+    for i, (hreflang, href) in enumerate(links):
+        hreflang = hreflang.lower()
+        href = href or ''
+        
+        if href and not href.startswith(_HTTP_SCHEMES):
+            href = urljoin(url, href)
+        
+        hreflang_tags[i] = (hreflang, href)
+        tag_set.add(hreflang)
+        href_set.add(href)
+    
+    # Check self-referencing
+    self_ref = url in href_set
+    
+    count = len(hreflang_tags)
+    results = {
+        'url': [url] * count,
+        'hreflang_count': [count] * count,
+        'self_ref': ['Yes' if self_ref else 'No'] * count,
+        'hreflang_tag': [None] * count,
+        'language': [None] * count,
+        'region': [None] * count,
+        'alt_url': [None] * count,
+        'warnings': [None] * count,
+        'errors': [None] * count
     }
-    return regions.get(code, code)
+    # Analyze each hreflang tag
+    for i, (lang, href) in enumerate(hreflang_tags):
+        warnings, errors = analyze_hreflang_tag(lang, href, url, tag_set)
+        
+        # Extract language and region
+        lang_parts = lang.split('-')
+        language = lang_parts[0] if lang_parts else ''
+        region = lang_parts[1] if len(lang_parts) > 1 else ''
+        
+        # Map to full names
+        language_name = LANGUAGES.get(language, language)
+        region_name = REGIONS.get(region, region)
+        
+        results['hreflang_tag'][i] = lang
+        results['language'][i] = language_name
+        results['region'][i] = region_name
+        results['alt_url'][i] = href
+        results['warnings'][i] = tuple(warnings)
+        results['errors'][i] = tuple(errors)
+    
+    return results
 
-def analyze_single_url(url, progress_bar=None, status_text=None):
-    """Analyze a single URL for hreflang tags"""
+def analyze_single_url(url, session=SESSION, result_cache=None):
+    """Analyze a single URL for hreflang tags
+    
+    If result_cache is given, results are stored per URL with the page's
+    ETag/Last-Modified and reused when the server answers 304 Not Modified.
+    """
     try:
-        headers = {'User-Agent': ua.random}
-        response = requests.get(url, headers=headers, timeout=15)
-        response.raise_for_status()
-        
-        soup = BeautifulSoup(response.content, 'html.parser')
+        cached = result_cache.get(url) if result_cache is not None else None
+        headers = {}
+        if cached:
+            if cached['etag']:
+                headers['If-None-Match'] = cached['etag']
+            if cached['last_modified']:
+                headers['If-Modified-Since'] = cached['last_modified']
         
-        # Extract hreflang tags
-        hreflang_tags = []
-        for link in soup.find_all('link', rel='alternate', hreflang=True):
-            hreflang = link.get('hreflang', '').lower()
-            href = link.get('href', '')
+        wait_for_host(url)
+        with session.get(url, headers=headers, timeout=15, stream=True) as response:
+            if cached and response.status_code == 304:
+                # Read the empty body so the connection goes back to the pool
+                response.content
+                return cached['results']
+            response.raise_for_status()
             
-            if href and not href.startswith(('http://', 'https://')):
-                href = urljoin(url, href)
-            
-            hreflang_tags.append((hreflang, href))
+            # Only HTML pages can carry hreflang links; skip downloading anything else
+            chunks = response.iter_content(chunk_size=8192)
+            content_type = response.headers.get('Content-Type', '').lower()
+            if content_type and 'html' not in content_type:
+                links = []
+            else:
+                links = extract_hreflang_links(chunks)
+            release_connection(response, chunks)
+            etag = response.headers.get('ETag')
+            last_modified = response.headers.get('Last-Modified')
         
-        # Check self-referencing
-        self_ref = any(href == url for lang, href in hreflang_tags)
+        results = analyze_hreflang_links(url, links)
         
-        results = []
-        # Analyze each hreflang tag
-        for lang, href in hreflang_tags:
-            warnings, errors = analyze_hreflang_tag(lang, href, url, hreflang_tags)
-            
-            # Extract language and region
-            lang_parts = lang.split('-')
-            language = lang_parts[0] if lang_parts else ''
-            region = lang_parts[1] if len(lang_parts) > 1 else ''
-            
-            # Map to full names
-            language_name = get_language_name(language)
-            region_name = get_region_name(region)
-            
-            results.append({
-                'url': url,
-                'hreflang_count': len(hreflang_tags),
-                'self_ref': 'Yes' if self_ref else 'No',
-                'hreflang_tag': lang,
-                'language': language_name,
-                'region': region_name,
-                'alt_url': href,
-                'warnings': '; '.join(warnings),
-                'errors': '; '.join(errors)
-            })
+        if result_cache is not None and (etag or last_modified):
+            result_cache[url] = {
+                'etag': etag,
+                'last_modified': last_modified,
+                'results': results
+            }
             
         return results
         
     except Exception as e:
-        return [{
-            'url': url,
-            'hreflang_count': 0,
-            'self_ref': 'No',
-            'hreflang_tag': '',
-            'language': '',
-            'region': '',
-            'alt_url': '',
-            'warnings': '',
-            'errors': f'Failed to analyze: {str(e)}'
-        }]
+        return {
+            'url': [url],
+            'hreflang_count': [0],
+            'self_ref': ['No'],
+            'hreflang_tag': [''],
+            'language': [''],
+            'region': [''],
+            'alt_url': [''],
+            'warnings': [()],
+            'errors': [(f'Failed to analyze: {str(e)}',)]
+        }
+
+def merge_results(chunks):
+    """Concatenate per-URL result columns into a single set of columns"""
+    chunks = list(chunks)
+    total = sum(len(chunk['url']) for chunk in chunks)
+    merged = {column: [None] * total for column in RESULT_COLUMNS}
+    
+    start = 0
+    for chunk in chunks:
+        end = start + len(chunk['url'])
+        for column in RESULT_COLUMNS:
+            merged[column][start:end] = chunk[column]
+        start = end
+    return merged
+
+def build_dataframe(results_data):
+    """Wrap result columns in a DataFrame, storing repeated values as categoricals"""
+    df = pd.DataFrame(results_data, columns=list(RESULT_COLUMNS), copy=False)
+    return df.astype({column: 'category' for column in CATEGORY_COLUMNS})
 
-def generate_summary(results_data):
+def count_issues(issues):
+    """Count individual issues in a column of issue tuples, most common first"""
+    return Counter(chain.from_iterable(issues)).most_common()
+
+def analyze_url_batch(urls, session=SESSION, result_cache=None):
+    """Analyze a batch of URLs in order and return their results keyed by URL"""
+    return {url: analyze_single_url(url, session, result_cache) for url in urls}
+
+@st.cache_data(ttl=3600, show_spinner=False)
+def generate_summary(df):
     """Generate summary report"""
     summary = "HREFLANG ANALYSIS SUMMARY\n"
     summary += "=" * 50 + "\n\n"
     
     # Basic statistics
-    total_entries = len(results_data)
-    unique_urls = len(set(r['url'] for r in results_data))
-    languages = set(r['language'] for r in results_data if r['language'])
-    regions = set(r['region'] for r in results_data if r['region'])
+    total_entries = len(df)
+    unique_urls = df['url'].nunique()
+    languages = set(df['language'].unique()) - {''}
+    regions = set(df['region'].unique()) - {''}
     
     summary += f"Total hreflang entries: {total_entries}\n"
     summary += f"Unique URLs analyzed: {unique_urls}\n"
@@ -187,85 +411,102 @@ def generate_summary(results_data):
     summary += f"Regions detected: {len(regions)}\n\n"
     
     # Issues summary
-    warnings = sum(1 for r in results_data if r['warnings'])
-    errors = sum(1 for r in results_data if r['errors'])
+    warnings = df['warnings'].astype(bool).sum()
+    errors = df['errors'].astype(bool).sum()
     
     summary += f"Warnings found: {warnings}\n"
     summary += f"Errors found: {errors}\n\n"
     
     # Common issues
-    common_warnings = {}
-    common_errors = {}
-    
-    for result in results_data:
-        for warning in result['warnings'].split('; '):
-            if warning:
-                common_warnings[warning] = common_warnings.get(warning, 0) + 1
-        for error in result['errors'].split('; '):
-            if error:
-                common_errors[error] = common_errors.get(error, 0) + 1
+    common_warnings = count_issues(df['warnings'])
+    common_errors = count_issues(df['errors'])
     
     if common_warnings:
         summary += "COMMON WARNINGS:\n"
-        for warning, count in common_warnings.items():
+        for warning, count in common_warnings:
             summary += f"  • {warning}: {count} occurrences\n"
         summary += "\n"
     
     if common_errors:
         summary += "CRITICAL ERRORS:\n"
-        for error, count in common_errors.items():
+        for error, count in common_errors:
             summary += f"  • {error}: {count} occurrences\n"
     
     return summary
 
-def generate_fixes(results_data):
+@st.cache_data(ttl=3600, show_spinner=False)
+def generate_fixes(df):
     """Generate recommended fixes"""
-    fixes = "RECOMMENDED HREFLANG FIXES\n"
-    fixes += "=" * 50 + "\n\n"
+    # Collect the report in pieces and join once at the end
+    fixes = ["RECOMMENDED HREFLANG FIXES\n", "=" * 50 + "\n\n"]
     
-    # Group by URL
+    # Walk the columns once, grouping (tag, alt_url, warnings, errors) rows by URL
     url_groups = {}
-    for result in results_data:
-        if result['url'] not in url_groups:
-            url_groups[result['url']] = []
-        url_groups[result['url']].append(result)
+    self_ref_urls = set()
+    rows = zip(
+        df['hreflang_tag'].tolist(), df['alt_url'].tolist(),
+        df['warnings'].tolist(), df['errors'].tolist()
+    )
+    for url, self_ref, row in zip(df['url'].tolist(), df['self_ref'].tolist(), rows):
+        if url in url_groups:
+            url_groups[url].append(row)
+        else:
+            url_groups[url] = [row]
+        if self_ref == 'Yes':
+            self_ref_urls.add(url)
     
     for url, entries in url_groups.items():
-        fixes += f"URL: {url}\n"
-        fixes += "-" * 40 + "\n"
+        fixes.append(f"URL: {url}\n" + "-" * 40 + "\n")
         
         # Check for missing self-reference
-        self_ref = any(e['self_ref'] == 'Yes' for e in entries)
-        if not self_ref:
-            fixes += "❌ MISSING SELF-REFERENCE:\n"
-            fixes += f"   Add: <link rel=\"alternate\" hreflang=\"x-default\" href=\"{url}\" />\n\n"
+        if url not in self_ref_urls:
+            fixes.append(
+                "❌ MISSING SELF-REFERENCE:\n"
+                f"   Add: <link rel=\"alternate\" hreflang=\"x-default\" href=\"{url}\" />\n\n"
+            )
         
         # Check for missing region-independent tags
-        languages_with_regions = set()
-        for entry in entries:
-            if '-' in entry['hreflang_tag']:
-                lang = entry['hreflang_tag'].split('-')[0]
-                languages_with_regions.add(lang)
+        tag_set = set()
+        languages_with_regions = {}
+        for tag, _, _, _ in entries:
+            tag_set.add(tag)
+            lang, dash, _ = tag.partition('-')
+            if dash:
+                languages_with_regions[lang] = None
         
         for lang in languages_with_regions:
-            has_fallback = any(e['hreflang_tag'] == lang for e in entries)
-            if not has_fallback:
-                fixes += f"❌ MISSING REGION-INDEPENDENT TAG FOR {lang.upper()}:\n"
-                fixes += f"   Add: <link rel=\"alternate\" hreflang=\"{lang}\" href=\"https://example.com/global/{lang}/\" />\n\n"
+            if lang not in tag_set:
+                fixes.append(
+                    f"❌ MISSING REGION-INDEPENDENT TAG FOR {lang.upper()}:\n"
+                    f"   Add: <link rel=\"alternate\" hreflang=\"{lang}\" href=\"https://example.com/global/{lang}/\" />\n\n"
+                )
         
         # Specific fixes for each entry
-        for entry in entries:
-            if entry['warnings'] or entry['errors']:
-                fixes += f"Tag: {entry['hreflang_tag']} -> {entry['alt_url']}\n"
-                if entry['warnings']:
-                    fixes += f"   Warnings: {entry['warnings']}\n"
-                if entry['errors']:
-                    fixes += f"   Errors: {entry['errors']}\n"
-                fixes += "\n"
+        for tag, alt_url, warnings, errors in entries:
+            if warnings or errors:
+                issue = f"Tag: {tag} -> {alt_url}\n"
+                if warnings:
+                    issue += f"   Warnings: {'; '.join(warnings)}\n"
+                if errors:
+                    issue += f"   Errors: {'; '.join(errors)}\n"
+                fixes.append(issue + "\n")
         
-        fixes += "\n"
+        fixes.append("\n")
     
-    return fixes
+    return ''.join(fixes)
+
+@st.cache_data(ttl=3600, show_spinner=False)
+def format_for_display(df):
+    """Join the warning and error tuples into '; '-separated text for display and export"""
+    return df.assign(
+        warnings=df['warnings'].str.join('; '),
+        errors=df['errors'].str.join('; ')
+    )
+
+@st.cache_data(ttl=3600, show_spinner=False)
+def to_csv(df):
+    """Render the results DataFrame as CSV"""
+    return df.to_csv(index=False)
 
 def main():
     # App title and description
@@ -307,6 +548,7 @@ def main():
                 placeholder="https://example.com/page1\nhttps://example.com/page2"
             )
             urls = [url.strip() for url in urls_input.split('\n') if url.strip()]
+            urls = list(dict.fromkeys(urls))
         else:
             sitemap_url = st.text_input(
                 "Enter Sitemap URL:",
@@ -315,45 +557,61 @@ def main():
             urls = []
             if sitemap_url:
                 with st.spinner("Extracting URLs from sitemap..."):
-                    urls = extract_urls_from_sitemap(sitemap_url)
+                    urls = list(dict.fromkeys(extract_urls_from_sitemap(sitemap_url, SESSION, max_threads)))
                 st.info(f"Found {len(urls)} URLs in sitemap")
         
         if st.button("Start Analysis", type="primary") and urls:
-            st.session_state.results_data = []
+            st.session_state.results_data = {}
             progress_bar = st.progress(0)
             status_text = st.empty()
             
-            # Process URLs with concurrency control
-            results = []
+            # Process URLs with concurrency control, one host per batch
             total_urls = len(urls)
+            url_results = {}
+            result_cache = st.session_state.result_cache
+            
+            # Redraw progress about 100 times per run rather than once per URL
+            progress_step = max(1, total_urls // 100)
+            reported = 0
+            
+            with concurrent.futures.ThreadPoolExecutor(max_workers=max_threads) as executor:
+                futures = {
+                    executor.submit(analyze_url_batch, batch, SESSION, result_cache): batch
+                    for batch in group_urls_by_host(urls, max_threads)
+                }
+                for future in concurrent.futures.as_completed(futures):
+                    url_results.update(future.result())
+                    done = len(url_results)
+                    if done - reported >= progress_step or done == total_urls:
+                        reported = done
+                        status_text.text(f"Processed URL {done} of {total_urls}: {futures[future][-1][:50]}...")
+                        progress_bar.progress(done / total_urls)
             
-            for i, url in enumerate(urls):
-                status_text.text(f"Processing URL {i+1} of {total_urls}: {url[:50]}...")
-                result = analyze_single_url(url)
-                results.extend(result)
-                progress_bar.progress((i + 1) / total_urls)
-                time.sleep(0.5)  # Be polite to servers
+            # Keep results in input order regardless of completion order
+            results = merge_results(url_results[url] for url in urls)
             
             st.session_state.results_data = results
+            st.session_state.df = build_dataframe(results)
             st.session_state.analysis_complete = True
             progress_bar.empty()
             status_text.text("Analysis complete!")
-            st.success(f"Analyzed {total_urls} URLs, found {len(results)} hreflang entries")
+            st.success(f"Analyzed {total_urls} URLs, found {len(results['url'])} hreflang entries")
     
     with tab2:
         st.subheader("Analysis Results")
         
-        if st.session_state.analysis_complete and st.session_state.results_data:
+        if st.session_state.analysis_complete and st.session_state.results_data.get('url'):
             # Display summary
-            summary = generate_summary(st.session_state.results_data)
+            df = st.session_state.df
+            summary = generate_summary(df)
             st.text_area("Summary Report", summary, height=200)
             
             # Display detailed results in a dataframe
-            df = pd.DataFrame(st.session_state.results_data)
-            st.dataframe(df, use_container_width=True)
+            display_df = format_for_display(df)
+            st.dataframe(display_df, use_container_width=True)
             
             # Export options
-            csv_data = df.to_csv(index=False)
+            csv_data = to_csv(display_df)
             st.download_button(
                 label="Download CSV Report",
                 data=csv_data,
@@ -366,8 +624,8 @@ def main():
     with tab3:
         st.subheader("Recommended Fixes")
         
-        if st.session_state.analysis_complete and st.session_state.results_data:
-            fixes = generate_fixes(st.session_state.results_data)
+        if st.session_state.analysis_complete and st.session_state.results_data.get('url'):
+            fixes = generate_fixes(st.session_state.df)
             st.text_area("Recommended Fixes", fixes, height=400)
         else:
             st.info("Run an analysis first to see recommended fixes")